@@ -133,12 +133,12 @@ export async function install(options: InstallOptions): Promise<void> {
         if (fs.existsSync(requirementsPath)) {
             execSync(`pip3 install -r ${requirementsPath}`, { stdio: "inherit" });
         } else {
-            execSync("pip3 install pynput", { stdio: "inherit" });
+            execSync("pip3 install pynput numpy", { stdio: "inherit" });
         }
         console.log("  ✓ Python dependencies installed\n");
     } catch (e) {
         console.error("  ✗ Failed to install Python dependencies");
-        console.error("    Try manually: pip3 install pynput");
+        console.error("    Try manually: pip3 install pynput numpy");
     }
 
     // Step 4: Install OpenClaw plugin
@@ -0,0 +1,71 @@
+"""
+OpenHeart Numeric Kernels
+
+Scalar math behind the stress and flow heuristics, compiled with Numba when
+it is installed and run as plain Python otherwise.
+"""
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit."""
+        def decorator(fn):
+            return fn
+        return decorator
+
+
+# Normalization constants, folded into reciprocals and nanosecond scaling
+# so the kernels only multiply. Numba freezes module globals at compile time.
+_SPEED_K = 1e-9 / 0.3     # Mean interval (ns) -> fraction of 300ms
+_JITTER_K = 1e-18 / 0.05  # Interval variance (ns^2) -> fraction of 50ms variance
+_ERROR_K = 1.0 / 0.15     # Backspace ratio -> fraction of 15%
+_SPEED_W = 0.3
+_JITTER_W = 0.4
+_ERROR_W = 0.3
+
+
+@njit(cache=True)
+def stress_from_stats(avg_interval, variance, backspace_ratio):
+    """Weighted stress index from mean interval (ns), variance (ns^2) and backspace ratio."""
+    speed_stress = max(0.0, 1.0 - avg_interval * _SPEED_K)  # Faster = more stressed
+    jitter_stress = min(1.0, variance * _JITTER_K)          # Variance = cognitive friction
+    error_stress = min(1.0, backspace_ratio * _ERROR_K)     # Backspaces = frustration
+    return _SPEED_W * speed_stress + _JITTER_W * jitter_stress + _ERROR_W * error_stress
+
+
+@njit(cache=True)
+def stress_kernel(avg_interval, variance, n, backspace_count, total_keys, window_size):
+    """
+    Stress index from interval mean (ns) and variance (ns^2) over n samples.
+
+    Returns:
+        (stress_index, confidence), unrounded
+    """
+    backspace_ratio = backspace_count / total_keys if total_keys > 0 else 0.0
+
+    stress_index = stress_from_stats(avg_interval, variance, backspace_ratio)
+
+    # Confidence based on data quantity
+    confidence = min(1.0, n / window_size)
+
+    return stress_index, confidence
+
+
+@njit(cache=True)
+def flow_kernel(sum_s, sum_s2, n):
+    """
+    Mean and variance of stress readings from running sums.
+
+    Returns:
+        (avg_stress, stress_variance)
+    """
+    avg_stress = sum_s / n
+    stress_variance = max(0.0, sum_s2 / n - avg_stress * avg_stress)
+    return avg_stress, stress_variance
+
+
+def prime_kernels():
+    """Call each kernel once so JIT compilation happens before the first keystroke."""
+    stress_kernel(0.0, 0.0, 5, 0, 1, 50)  # Same argument types as live calls
+    flow_kernel(0.0, 0.0, 1)
@@ -5,22 +5,107 @@ Monitors keyboard input timing patterns to detect stress and flow states.
 Privacy-first: Only timing data is processed, never key contents.
 """
 
+import math
 import time
+import array
 import logging
 from typing import Callable, List, Optional
 from threading import Event
 from collections import deque
 from dataclasses import dataclass
 
+import numpy as np
+
+from _kernels import stress_kernel, flow_kernel, prime_kernels
+
+# Queued events are packed ints: monotonic ns timestamp << 2 | flags
+_EVENT_RELEASE = 0b01
+_EVENT_BACKSPACE = 0b10
+
 
 @dataclass
 class KeyEvent:
     """Represents a single keystroke event (timing only, no content)."""
-    timestamp: float  # Unix timestamp in seconds
+    timestamp: int    # Monotonic clock in nanoseconds
     event_type: str   # "press" or "release"
     is_backspace: bool
 
 
+class RollingStats:
+    """
+    Fixed-size window of integer samples with O(1) running mean and variance.
+    
+    Samples live in a preallocated int64 ring, and a running sum and sum of
+    squares are adjusted as samples enter and leave the window, so reading
+    the statistics never rescans it.
+    """
+    
+    def __init__(self, maxlen: int):
+        self._values = np.empty(maxlen, dtype=np.int64)
+        self._maxlen = maxlen
+        self._head: int = 0
+        self._count: int = 0
+        # Python ints keep both sums exact
+        self.sum_x = 0
+        self.sum_x2 = 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def append(self, x: int):
+        """Add a sample, evicting the oldest one if the window is full."""
+        head = self._head
+        if self._count == self._maxlen:
+            old = int(self._values[head])
+            self.sum_x -= old
+            self.sum_x2 -= old * old
+        else:
+            self._count += 1
+        self._values[head] = x
+        self._head = (head + 1) % self._maxlen
+        self.sum_x += x
+        self.sum_x2 += x * x
+    
+    def mean(self) -> float:
+        return self.sum_x / self._count
+    
+    def variance(self) -> float:
+        """Population variance."""
+        n = self._count
+        return (n * self.sum_x2 - self.sum_x * self.sum_x) / (n * n)
+
+
+class RollingMax:
+    """
+    Maximum of the last `window` samples in amortized O(1).
+    
+    Keeps a monotonic deque of (sequence, value) pairs with decreasing
+    values; the head is always the window maximum.
+    """
+    
+    def __init__(self, window: int):
+        self._window = window
+        self._queue: deque = deque()
+        self._seq: int = 0
+    
+    def append(self, x: float):
+        """Add a sample, dropping entries it dominates or that left the window."""
+        queue = self._queue
+        while queue and queue[-1][1] <= x:
+            queue.pop()
+        queue.append((self._seq, x))
+        if queue[0][0] <= self._seq - self._window:
+            queue.popleft()
+        self._seq += 1
+    
+    def max(self) -> float:
+        return self._queue[0][1]
+    
+    def clear(self):
+        """Drop all samples."""
+        self._queue.clear()
+
+
 class KeystrokeAnalyzer:
     """
     Analyzes keystroke timing patterns to detect stress levels.
@@ -45,60 +130,99 @@ class KeystrokeAnalyzer:
         self.logger = logger or logging.getLogger(__name__)
         self.window_size = window_size
         self.update_interval = update_interval
+        self._update_interval_ns = int(update_interval * 1_000_000_000)
         
-        # Timing data (privacy-safe: only intervals, not key codes)
-        self.intervals: deque = deque(maxlen=window_size)
-        self.dwell_times: deque = deque(maxlen=window_size)
+        # Timing data in nanoseconds (privacy-safe: only intervals, not key codes)
+        self.intervals = RollingStats(window_size)
+        self.dwell_times = RollingStats(window_size)
         self.backspace_count: int = 0
         self.total_keys: int = 0
         
         # State tracking
-        self.last_key_time: Optional[float] = None
-        self.last_press_time: Optional[float] = None
-        self.last_update_time: float = 0
+        self.last_key_time: Optional[int] = None
+        self.last_press_time: Optional[int] = None
+        self.last_update_time: int = 0
+        self._backspace_key = None  # Resolved from pynput in start()
+        
+        # Events handed over from the listener thread. deque append/popleft
+        # are atomic, so the listener callback never waits on analysis.
+        self._events: deque = deque()
         
         # Flow state detection
         self.flow_start_time: Optional[float] = None
-        self.flow_consistency_buffer: deque = deque(maxlen=60)  # 1 minute
+        # Ring of recent stress readings spanning 5 minutes of updates.
+        # Typing pauses longer than this (one idle drain tolerated) start
+        # the ring over, so readings never span an idle gap.
+        self._flow_capacity = math.ceil(300 / update_interval)
+        self._flow_max_gap_ns = 3 * self._update_interval_ns
+        self._flow_ring = array.array("d", [0.0] * self._flow_capacity)
+        self._flow_last_time: Optional[int] = None
+        self._flow_max = RollingMax(self._flow_capacity)
+        self._reset_flow()
     
     def _on_key_press(self, key):
-        """Handle key press event. Extract timing only."""
-        now = time.time()
-        
-        # Calculate flight time (time since last key release)
-        if self.last_key_time is not None:
-            interval = now - self.last_key_time
-            if interval < 2.0:  # Ignore long pauses
-                self.intervals.append(interval)
-        
-        # Track press time for dwell calculation
-        self.last_press_time = now
-        self.total_keys += 1
+        """Queue a key press (listener thread). Extract timing only."""
+        flags = _EVENT_BACKSPACE if key is self._backspace_key else 0
+        self._events.append(time.monotonic_ns() << 2 | flags)
+    
+    def _on_key_release(self, key):
+        """Queue a key release (listener thread)."""
+        self._events.append(time.monotonic_ns() << 2 | _EVENT_RELEASE)
+    
+    def _drain_events(self):
+        """Process queued keystroke events on the analysis thread."""
+        events = self._events
+        batch = [events.popleft() for _ in range(len(events))]
+        if not batch:
+            return
         
-        # Check if backspace (privacy-safe check)
-        try:
-            from pynput import keyboard
-            if key == keyboard.Key.backspace:
-                self.backspace_count += 1
-        except:
-            pass
+        presses = self._ingest_batch(batch)
         
-        # Periodic state update
-        if now - self.last_update_time >= self.update_interval:
+        # At most one state update per drain, paced by the drain's own clock
+        now = time.monotonic_ns()
+        if presses and now - self.last_update_time >= self._update_interval_ns:
             self._update_state()
             self.last_update_time = now
     
-    def _on_key_release(self, key):
-        """Handle key release event. Calculate dwell time."""
-        now = time.time()
+    def _ingest_batch(self, batch: List[int]) -> int:
+        """
+        Fold a batch of packed events into the timing statistics.
+        
+        Returns:
+            Number of key presses in the batch
+        """
+        append_interval = self.intervals.append
+        append_dwell = self.dwell_times.append
+        last_key_time = self.last_key_time
+        last_press_time = self.last_press_time
+        presses = 0
+        backspaces = 0
         
-        # Calculate dwell time
-        if self.last_press_time is not None:
-            dwell = now - self.last_press_time
-            if dwell < 1.0:  # Reasonable dwell time
-                self.dwell_times.append(dwell)
+        for event in batch:
+            now = event >> 2
+            if event & _EVENT_RELEASE:
+                # Dwell time (time since last key press)
+                if last_press_time is not None:
+                    dwell = now - last_press_time
+                    if dwell < 1_000_000_000:  # Reasonable dwell time (1s)
+                        append_dwell(dwell)
+                last_key_time = now
+            else:
+                # Flight time (time since last key release)
+                if last_key_time is not None:
+                    interval = now - last_key_time
+                    if interval < 2_000_000_000:  # Ignore long pauses (2s)
+                        append_interval(interval)
+                last_press_time = now
+                presses += 1
+                if event & _EVENT_BACKSPACE:
+                    backspaces += 1
         
-        self.last_key_time = now
+        self.last_key_time = last_key_time
+        self.last_press_time = last_press_time
+        self.total_keys += presses
+        self.backspace_count += backspaces
+        return presses
     
     def _calculate_stress_heuristic(self) -> tuple[float, float]:
         """
@@ -107,73 +231,67 @@ class KeystrokeAnalyzer:
         Returns:
             (stress_index, confidence)
         """
-        if len(self.intervals) < 5:
+        intervals = self.intervals
+        if len(intervals) < 5:
             return 0.0, 0.0  # Not enough data
         
-        # 1. Typing speed component (faster = potentially more stressed)
-        avg_interval = sum(self.intervals) / len(self.intervals)
-        speed_stress = max(0, 1.0 - (avg_interval / 0.3))  # Normalize around 300ms
-        
-        # 2. Variance component (high variance = cognitive friction)
-        if len(self.intervals) >= 3:
-            mean = sum(self.intervals) / len(self.intervals)
-            variance = sum((x - mean) ** 2 for x in self.intervals) / len(self.intervals)
-            jitter_stress = min(1.0, variance / 0.05)  # Normalize around 50ms variance
-        else:
-            jitter_stress = 0.0
-        
-        # 3. Error rate component (more backspaces = frustration)
-        if self.total_keys > 0:
-            backspace_ratio = self.backspace_count / self.total_keys
-            error_stress = min(1.0, backspace_ratio / 0.15)  # Normalize around 15%
-        else:
-            error_stress = 0.0
-        
-        # Weighted combination
-        stress_index = (
-            0.3 * speed_stress +
-            0.4 * jitter_stress +
-            0.3 * error_stress
+        # Mean and variance come exactly from the integer running sums
+        stress_index, confidence = stress_kernel(
+            intervals.mean(), intervals.variance(), len(intervals),
+            self.backspace_count, self.total_keys, self.window_size
         )
         
-        # Confidence based on data quantity
-        confidence = min(1.0, len(self.intervals) / self.window_size)
-        
         return round(stress_index, 2), round(confidence, 2)
     
+    def _reset_flow(self):
+        """Forget all flow readings (the ring contents are overwritten lazily)."""
+        self._flow_head: int = 0
+        self._flow_count: int = 0
+        self._flow_sum: float = 0.0
+        self._flow_sum2: float = 0.0
+        self._flow_max.clear()
+    
     def _detect_flow_state(self, stress_index: float) -> str:
         """
         Detect flow state based on stress consistency.
         
         Flow states:
-        - DEEP_FLOW: Low stress, consistent rhythm for 5+ minutes
-        - CALM: Low stress, short duration
+        - DEEP_FLOW: Stress below 0.3 throughout 5+ minutes of typing
+          without idle gaps, with a consistent rhythm
+        - CALM: Low stress
         - NORMAL: Moderate stress
         - STRESSED: High stress
         """
-        now = time.time()
+        now = time.monotonic_ns()
+        if (self._flow_last_time is not None
+                and now - self._flow_last_time > self._flow_max_gap_ns):
+            self._reset_flow()
+        self._flow_last_time = now
         
-        # Add to consistency buffer
-        self.flow_consistency_buffer.append((now, stress_index))
+        ring = self._flow_ring
+        head = self._flow_head
         
-        # Cleanup old entries
-        cutoff = now - 300  # 5 minutes
-        while self.flow_consistency_buffer and self.flow_consistency_buffer[0][0] < cutoff:
-            self.flow_consistency_buffer.popleft()
+        # Overwrite the oldest reading once the ring is full
+        if self._flow_count == self._flow_capacity:
+            old = ring[head]
+            self._flow_sum -= old
+            self._flow_sum2 -= old * old
+        else:
+            self._flow_count += 1
+        ring[head] = stress_index
+        self._flow_head = (head + 1) % self._flow_capacity
+        self._flow_sum += stress_index
+        self._flow_sum2 += stress_index * stress_index
+        self._flow_max.append(stress_index)
         
-        # Calculate average stress over window
-        if len(self.flow_consistency_buffer) >= 5:
-            recent_stress = [s for _, s in self.flow_consistency_buffer]
-            avg_stress = sum(recent_stress) / len(recent_stress)
-            stress_variance = sum((s - avg_stress) ** 2 for s in recent_stress) / len(recent_stress)
-            
-            # Detect deep flow
-            if avg_stress < 0.3 and stress_variance < 0.02:
-                duration = now - self.flow_consistency_buffer[0][0]
-                if duration >= 300:  # 5 minutes
-                    return "DEEP_FLOW"
-                elif duration >= 60:  # 1 minute
-                    return "CALM"
+        # Detect deep flow over a full window (updates are at least
+        # update_interval apart with no idle gaps, so a full ring spans
+        # 5+ minutes of typing)
+        n = self._flow_count
+        if n >= self._flow_capacity and self._flow_max.max() < 0.3:
+            _, stress_variance = flow_kernel(self._flow_sum, self._flow_sum2, n)
+            if stress_variance < 0.02:
+                return "DEEP_FLOW"
         
         # Simple thresholds
         if stress_index < 0.3:
@@ -189,8 +307,8 @@ class KeystrokeAnalyzer:
         flow_state = self._detect_flow_state(stress_index)
         
         self.logger.debug(
-            f"State update: stress={stress_index}, flow={flow_state}, "
-            f"confidence={confidence}, samples={len(self.intervals)}"
+            "State update: stress=%s, flow=%s, confidence=%s, samples=%d",
+            stress_index, flow_state, confidence, len(self.intervals)
         )
         
         # Notify callback
@@ -203,9 +321,16 @@ class KeystrokeAnalyzer:
         Args:
             shutdown_event: Event to signal shutdown
         """
+        # Compile numeric kernels now rather than on the first update. Kept
+        # outside the listener error handling so a compile failure is not
+        # reported as a permissions problem.
+        prime_kernels()
+        
         try:
             from pynput import keyboard
             
+            self._backspace_key = keyboard.Key.backspace
+            
             self.logger.info("Keystroke monitoring started")
             self.logger.info("Privacy mode: Only timing patterns are analyzed, no key contents")
             
@@ -217,9 +342,10 @@ class KeystrokeAnalyzer:
             
             listener.start()
             
-            # Wait for shutdown signal
+            # Analyze queued events until shutdown signal
             while not shutdown_event.is_set():
-                shutdown_event.wait(timeout=1.0)
+                shutdown_event.wait(timeout=self.update_interval)
+                self._drain_events()
             
             listener.stop()
             self.logger.info("Keystroke monitoring stopped")
@@ -115,6 +115,10 @@ def main():
         
         analyzer.start(shutdown_event)
         
+        # Wake the socket server so it can remove its socket file
+        server.stop()
+        server_thread.join(timeout=1.0)
+        
     except KeyboardInterrupt:
         logger.info("Keyboard interrupt received")
     except Exception as e:
@@ -6,14 +6,28 @@ Falls back to JSON file for compatibility.
 """
 
 import os
-import json
 import socket
 import time
 import logging
+import tempfile
+import selectors
 from pathlib import Path
 from threading import Lock
 from typing import Callable, Optional
 
+try:
+    from orjson import dumps as _dumps
+except ImportError:  # orjson is optional
+    import json
+    
+    def _dumps(obj) -> bytes:
+        """Compact JSON encoding to bytes (stdlib fallback for orjson.dumps)."""
+        return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+# Republish an unchanged reading at least this often (seconds), so its
+# timestamp stays well inside the 30s TTL
+STATE_REFRESH_SECONDS = 5.0
+
 
 class BiometricServer:
     """
@@ -22,7 +36,7 @@ class BiometricServer:
     Features:
     - <1ms latency for state reads
     - Automatic file fallback
-    - Thread-safe state updates
+    - Lock-free state reads, serialized state updates
     """
     
     def __init__(
@@ -34,7 +48,10 @@ class BiometricServer:
         self.socket_path = socket_path
         self.state_file = state_file
         self.logger = logger or logging.getLogger(__name__)
-        self._lock = Lock()
+        self._write_lock = Lock()
+        
+        # Self-pipe used by stop() to wake the server loop (owned by start())
+        self._wakeup_w: Optional[int] = None
         
         # Current state
         self._state = {
@@ -46,9 +63,12 @@ class BiometricServer:
             "confidence": 0.0,
             "source": "initialization"
         }
+        self._state_bytes = _dumps(self._state)
+        self._last_signature: Optional[tuple] = None
+        self._last_publish_time: float = 0.0
         
         # Write initial state to file
-        self._write_state_file()
+        self._write_state_file(self._state_bytes)
     
     def update_state(
         self,
@@ -64,41 +84,76 @@ class BiometricServer:
             stress_index: Normalized stress level [0.0, 1.0]
             flow_state: One of CALM, NORMAL, STRESSED, DEEP_FLOW, UNKNOWN
             confidence: Confidence in this reading [0.0, 1.0]
-            source: Source of this reading (keystroke, mouse, calendar)
+            source: Source of this reading (e.g. keystroke)
         """
-        with self._lock:
-            self._state = {
-                "stress_index": round(max(0.0, min(1.0, stress_index)), 2),
+        stress_index = round(max(0.0, min(1.0, stress_index)), 2)
+        confidence = round(confidence, 2)
+        
+        # Writers are serialized; readers never take this lock
+        with self._write_lock:
+            # Skip re-encoding and rewriting an unchanged reading until it
+            # needs a fresh timestamp (timed on the monotonic clock, so wall
+            # clock steps cannot hold back the refresh)
+            now = time.monotonic()
+            signature = (stress_index, flow_state, confidence, source)
+            if (signature == self._last_signature
+                    and now - self._last_publish_time < STATE_REFRESH_SECONDS):
+                return
+            self._last_signature = signature
+            self._last_publish_time = now
+            
+            state = {
+                "stress_index": stress_index,
                 "flow_state": flow_state,
                 "timestamp": int(time.time() * 1000),
                 "ttl_seconds": 30,
                 "daemon_pid": os.getpid(),
-                "confidence": round(confidence, 2),
+                "confidence": confidence,
                 "source": source
             }
+            state_bytes = _dumps(state)
+            
+            # Rebinding is atomic, so readers see either the old or the new
+            # bytes without a lock; _state_bytes never depends on _state.
+            self._state = state
+            self._state_bytes = state_bytes
             
-            # Also write to file as fallback
-            self._write_state_file()
+            # Also write to file as fallback (from our own snapshot)
+            self._write_state_file(state_bytes)
     
-    def _write_state_file(self):
-        """Write current state to JSON file (fallback for socket failures)."""
+    def _write_state_file(self, state_bytes: bytes):
+        """
+        Write current state to JSON file (fallback for socket failures).
+        
+        Written to a temporary file and renamed into place, so readers never
+        see a partially written state. Each write gets its own temporary
+        file, so concurrent writers cannot interleave into one.
+        """
         try:
             self.state_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(self.state_file, "w") as f:
-                json.dump(self._state, f, indent=2)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=self.state_file.parent, prefix=".state-", suffix=".tmp"
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(state_bytes)
+                os.replace(tmp_path, self.state_file)
+            except Exception:
+                os.unlink(tmp_path)
+                raise
         except Exception as e:
             self.logger.error(f"Failed to write state file: {e}")
     
     def _get_state_json(self) -> bytes:
-        """Get current state as JSON bytes (thread-safe)."""
-        with self._lock:
-            return json.dumps(self._state).encode("utf-8")
+        """Get current state as JSON bytes (lock-free, encoded once per update)."""
+        return self._state_bytes
     
     def start(self):
         """
         Start the Unix socket server.
         
-        This method blocks and should be run in a separate thread.
+        This method blocks until stop() is called and should be run in a
+        separate thread.
         """
         # Remove stale socket file
         if self.socket_path.exists():
@@ -107,34 +162,68 @@ class BiometricServer:
         # Create socket directory
         self.socket_path.parent.mkdir(parents=True, exist_ok=True)
         
-        # Create Unix socket
+        # Create Unix socket. This stays SOCK_STREAM: the clients are Node's
+        # net module, which has no AF_UNIX datagram support, and they read
+        # one state document per connection until EOF.
         server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        selector = selectors.DefaultSelector()
+        wakeup_r, self._wakeup_w = os.pipe()
         
         try:
             server.bind(str(self.socket_path))
-            server.listen(5)
-            server.settimeout(1.0)  # Allow periodic checks for shutdown
+            server.listen(64)  # Room for bursts of short-lived reader connections
+            server.setblocking(False)
+            
+            # Sleep until a client connects or stop() is called
+            selector.register(server, selectors.EVENT_READ)
+            selector.register(wakeup_r, selectors.EVENT_READ)
             
             self.logger.info(f"Socket server listening on {self.socket_path}")
             
-            while True:
-                try:
-                    conn, _ = server.accept()
+            running = True
+            while running:
+                for key, _ in selector.select():
+                    if key.fileobj is not server:
+                        running = False
+                        break
                     try:
+                        conn, _ = server.accept()
+                    except BlockingIOError:
+                        # Client went away before we accepted
+                        continue
+                    except Exception as e:
+                        self.logger.error(f"Socket error: {e}")
+                        continue
+                    try:
+                        # Accepted sockets can inherit O_NONBLOCK (macOS/BSD)
+                        conn.setblocking(True)
+                        
                         # Send current state
                         data = self._get_state_json()
                         conn.sendall(data)
+                    except Exception as e:
+                        self.logger.error(f"Socket error: {e}")
                     finally:
                         conn.close()
-                except socket.timeout:
-                    # Normal timeout, continue loop
-                    continue
-                except Exception as e:
-                    self.logger.error(f"Socket error: {e}")
                     
         finally:
+            selector.close()
             server.close()
+            # Unpublish the write end before closing so stop() never writes
+            # to a reused descriptor
+            wakeup_w, self._wakeup_w = self._wakeup_w, None
+            os.close(wakeup_w)
+            os.close(wakeup_r)
             if self.socket_path.exists():
                 self.socket_path.unlink()
             self.logger.info("Socket server stopped")
+    
+    def stop(self):
+        """Wake the server loop and make start() return."""
+        wakeup_w = self._wakeup_w
+        if wakeup_w is None:
+            return  # Server not running
+        try:
+            os.write(wakeup_w, b"\0")
+        except OSError:
+            pass  # Server stopped concurrently